@@ -9,6 +9,7 @@ from app.email_utils import (
     send_cannot_create_domain_alias,
     can_create_directory_for_address,
     send_cannot_create_directory_alias_disabled,
+    is_sl_domain,
 )
 from app.errors import AliasInTrashError
 from app.extensions import db
@@ -42,19 +43,17 @@ def try_auto_create_directory(address: str) -> Optional[Alias]:
     """
     # check if alias belongs to a directory, ie having directory/anything@EMAIL_DOMAIN format
     if can_create_directory_for_address(address):
-        # if there's no directory separator in the alias, no way to auto-create it
-        if "/" not in address and "+" not in address and "#" not in address:
-            return None
-
         # alias contains one of the 3 special directory separator: "/", "+" or "#"
-        if "/" in address:
-            sep = "/"
-        elif "+" in address:
-            sep = "+"
+        # in this order of priority
+        for sep in ("/", "+", "#"):
+            sep_index = address.find(sep)
+            if sep_index != -1:
+                break
         else:
-            sep = "#"
+            # if there's no directory separator in the alias, no way to auto-create it
+            return None
 
-        directory_name = address[: address.find(sep)]
+        directory_name = address[:sep_index]
         LOG.d("directory_name %s", directory_name)
 
         directory = Directory.get_by(name=directory_name)
@@ -114,6 +113,10 @@ def try_auto_create_catch_all_domain(address: str) -> Optional[Alias]:
     # try to create alias on-the-fly with custom-domain catch-all feature
     # check if alias is custom-domain alias and if the custom-domain has catch-all enabled
     alias_domain = get_email_domain_part(address)
+    # an SL domain can't be a custom domain
+    if is_sl_domain(alias_domain):
+        return None
+
     custom_domain: CustomDomain = CustomDomain.get_by(domain=alias_domain)
 
     if not custom_domain:
@@ -222,14 +225,14 @@ def nb_email_log_for_mailbox(mailbox: Mailbox):
 
 
 # Only lowercase letters, numbers, dots (.), dashes (-) and underscores (_) are currently supported
-_ALIAS_PREFIX_PATTERN = r"[0-9a-z-_.]{1,}"
+_ALIAS_PREFIX_PATTERN = re.compile(r"[0-9a-z-_.]{1,}")
 
 
 def check_alias_prefix(alias_prefix) -> bool:
     if len(alias_prefix) > 40:
         return False
 
-    if re.fullmatch(_ALIAS_PREFIX_PATTERN, alias_prefix) is None:
+    if _ALIAS_PREFIX_PATTERN.fullmatch(alias_prefix) is None:
         return False
 
     return True
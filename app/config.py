@@ -153,12 +153,21 @@ DKIM_PRIVATE_KEY = None
 
 if "DKIM_PRIVATE_KEY_PATH" in os.environ:
     DKIM_PRIVATE_KEY_PATH = get_abs_path(os.environ["DKIM_PRIVATE_KEY_PATH"])
-    with open(DKIM_PRIVATE_KEY_PATH) as f:
+    # kept in bytes, the form expected by dkim.sign()
+    with open(DKIM_PRIVATE_KEY_PATH, "rb") as f:
         DKIM_PRIVATE_KEY = f.read()
 
 
 # Database
 DB_URI = os.environ["DB_URI"]
+# connection pool, not used with SQLite
+# the email handler needs at least EMAIL_HANDLER_NB_WORKER connections
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+# seconds to wait for a free connection
+DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+# close connections older than that many seconds, before the database or pgbouncer drops them
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
 
 # Flask secret
 FLASK_SECRET = os.environ["FLASK_SECRET"]
@@ -184,11 +193,14 @@ except (KeyError, ValueError):
     PADDLE_YEARLY_PRODUCT_ID = -1
 
 # Other Paddle product IDS
-PADDLE_MONTHLY_PRODUCT_IDS = sl_getenv("PADDLE_MONTHLY_PRODUCT_IDS", list)
-PADDLE_MONTHLY_PRODUCT_IDS.append(PADDLE_MONTHLY_PRODUCT_ID)
+# sets as they are only used for membership tests
+PADDLE_MONTHLY_PRODUCT_IDS = frozenset(
+    sl_getenv("PADDLE_MONTHLY_PRODUCT_IDS", list) + [PADDLE_MONTHLY_PRODUCT_ID]
+)
 
-PADDLE_YEARLY_PRODUCT_IDS = sl_getenv("PADDLE_YEARLY_PRODUCT_IDS", list)
-PADDLE_YEARLY_PRODUCT_IDS.append(PADDLE_YEARLY_PRODUCT_ID)
+PADDLE_YEARLY_PRODUCT_IDS = frozenset(
+    sl_getenv("PADDLE_YEARLY_PRODUCT_IDS", list) + [PADDLE_YEARLY_PRODUCT_ID]
+)
 
 PADDLE_PUBLIC_KEY_PATH = get_abs_path(
     os.environ.get("PADDLE_PUBLIC_KEY_PATH", "local_data/paddle.key.pub")
@@ -374,3 +386,6 @@ except Exception:
 ALIAS_LIMIT = os.environ.get("ALIAS_LIMIT") or "100/day;50/hour;5/minute"
 
 ENABLE_SPAM_ASSASSIN = "ENABLE_SPAM_ASSASSIN" in os.environ
+
+# number of emails the email handler can process at the same time
+EMAIL_HANDLER_NB_WORKER = int(os.environ.get("EMAIL_HANDLER_NB_WORKER", 16))
@@ -1,3 +1,4 @@
+import re
 from dataclasses import dataclass
 from operator import or_
 
@@ -21,6 +22,10 @@ from app.log import LOG
 from app.models import Alias, Contact, EmailLog
 
 
+# the email part between the first "<" and the first ">", if "<" comes first
+_EMAIL_IN_ANGLE_BRACKETS = re.compile(r"[^<>]*<([^>]+)>")
+
+
 def email_validator():
     """validate email address. Handle both only email and email with name:
     - ab@cd.com
@@ -34,9 +39,9 @@ def email_validator():
         email = email.strip()
         email_part = email
 
-        if "<" in email and ">" in email:
-            if email.find("<") + 1 < email.find(">"):
-                email_part = email[email.find("<") + 1 : email.find(">")].strip()
+        m = _EMAIL_IN_ANGLE_BRACKETS.match(email)
+        if m:
+            email_part = m.group(1).strip()
 
         if not is_valid_email(email_part):
             raise ValidationError(message)
@@ -89,8 +94,11 @@ def get_contact_infos(alias: Alias, page=0, contact_id=None) -> [ContactInfo]:
         )
         .filter(Contact.alias_id == alias.id)
         .group_by(Contact.id)
-        .subquery()
     )
+    # only aggregate the email logs of this contact instead of the whole alias
+    if contact_id:
+        sub = sub.filter(Contact.id == contact_id)
+    sub = sub.subquery()
 
     q = (
         db.session.query(
@@ -1,11 +1,15 @@
+from typing import Tuple
+
 import arrow
-from flask import render_template, flash, redirect, url_for
+from flask import render_template, flash, redirect, url_for, request
 from flask_login import login_required, current_user
+from sqlalchemy import and_, func, case
 
 from app.config import PAGE_LIMIT
 from app.dashboard.base import dashboard_bp
 from app.extensions import db
 from app.models import Alias, EmailLog, Contact
+from app.utils import TTLCache
 
 
 class AliasLog:
@@ -24,14 +28,23 @@ class AliasLog:
             setattr(self, k, v)
 
 
-@dashboard_bp.route(
-    "/alias_log/<int:alias_id>", methods=["GET"], defaults={"page_id": 0}
-)
 @dashboard_bp.route("/alias_log/<int:alias_id>/<int:page_id>")
 @login_required
-def alias_log(alias_id, page_id):
+def alias_log_page(alias_id, page_id):
+    # links from before the keyset pagination: a page number can't be mapped
+    # to an EmailLog id without the OFFSET scan, start from the first page
+    return redirect(url_for("dashboard.alias_log", alias_id=alias_id))
+
+
+@dashboard_bp.route("/alias_log/<int:alias_id>", methods=["GET"])
+@login_required
+def alias_log(alias_id):
     alias = Alias.get(alias_id)
 
+    # keyset pagination: "before" and "after" are EmailLog ids
+    before_id = request.args.get("before", type=int)
+    after_id = request.args.get("after", type=int)
+
     # sanity check
     if not alias:
         flash("You do not have access to this page", "warning")
@@ -41,40 +54,64 @@ def alias_log(alias_id, page_id):
         flash("You do not have access to this page", "warning")
         return redirect(url_for("dashboard.index"))
 
-    logs = get_alias_log(alias, page_id)
-    base = (
-        db.session.query(Contact, EmailLog)
-        .filter(Contact.id == EmailLog.contact_id)
-        .filter(Contact.alias_id == alias.id)
+    # lightweight pagination without counting all objects:
+    # fetch one more log to know whether there's a next (or previous) page
+    logs = get_alias_log(
+        alias, before_id=before_id, after_id=after_id, limit=PAGE_LIMIT + 1
     )
-    total = base.count()
-    email_forwarded = (
-        base.filter(EmailLog.is_reply.is_(False))
-        .filter(EmailLog.blocked.is_(False))
-        .count()
-    )
-    email_replied = base.filter(EmailLog.is_reply.is_(True)).count()
-    email_blocked = base.filter(EmailLog.blocked.is_(True)).count()
-    last_page = (
-        len(logs) < PAGE_LIMIT
-    )  # lightweight pagination without counting all objects
+    if after_id:
+        # going backward can end up on a partial first page, show the full one instead
+        if len(logs) <= PAGE_LIMIT:
+            after_id = None
+            logs = get_alias_log(alias, limit=PAGE_LIMIT + 1)
+        else:
+            # the extra log is the most recent one, it belongs to the previous page
+            # and there's at least the log that "after" points to on the next page
+            logs = logs[1:]
+    # the logs older than "before" might have been deleted since the link was generated
+    elif before_id and not logs:
+        before_id = None
+        logs = get_alias_log(alias, limit=PAGE_LIMIT + 1)
+
+    first_page = not before_id and not after_id
+    last_page = not after_id and len(logs) <= PAGE_LIMIT
+    logs = logs[:PAGE_LIMIT]
+    total, email_forwarded, email_replied, email_blocked = get_alias_log_stats(alias.id)
 
     return render_template("dashboard/alias_log.html", **locals())
 
 
-def get_alias_log(alias: Alias, page_id=0) -> [AliasLog]:
+def get_alias_log(
+    alias: Alias,
+    page_id=0,
+    before_id: int = None,
+    after_id: int = None,
+    limit: int = PAGE_LIMIT,
+) -> [AliasLog]:
+    """return the alias logs, most recent first.
+    If before_id or after_id is set, return the page of logs right before/after this EmailLog id,
+    which uses the EmailLog primary key index instead of scanning and discarding `page_id * PAGE_LIMIT` rows.
+    """
     logs: [AliasLog] = []
 
     q = (
         db.session.query(Contact, EmailLog)
         .filter(Contact.id == EmailLog.contact_id)
         .filter(Contact.alias_id == alias.id)
-        .order_by(EmailLog.id.desc())
-        .limit(PAGE_LIMIT)
-        .offset(page_id * PAGE_LIMIT)
     )
 
-    for contact, email_log in q:
+    if before_id:
+        q = q.filter(EmailLog.id < before_id).order_by(EmailLog.id.desc())
+    elif after_id:
+        q = q.filter(EmailLog.id > after_id).order_by(EmailLog.id.asc())
+    else:
+        q = q.order_by(EmailLog.id.desc()).offset(page_id * PAGE_LIMIT)
+
+    rows = q.limit(limit).all()
+    if after_id:
+        rows.reverse()
+
+    for contact, email_log in rows:
         al = AliasLog(
             website_email=contact.website_email,
             reverse_alias=contact.website_send_to(),
@@ -87,6 +124,50 @@ def get_alias_log(alias: Alias, page_id=0) -> [AliasLog]:
             contact=contact,
         )
         logs.append(al)
-    logs = sorted(logs, key=lambda l: l.when, reverse=True)
 
     return logs
+
+
+# the stats only change when emails flow, keep them for a short time
+# so navigating through the alias log doesn't recount all email logs.
+# New emails are counted once the entry expires: as each gunicorn worker
+# has its own copy, the stats can differ between requests for up to the TTL
+# alias_id -> (handled, forwarded, replied, blocked)
+_alias_log_stats_cache = TTLCache(ttl=60)
+
+
+def get_alias_log_stats(alias_id: int) -> Tuple[int, int, int, int]:
+    """return the number of (handled, forwarded, replied, blocked) emails of an alias"""
+    stats = _alias_log_stats_cache.get(alias_id)
+    if stats:
+        return stats
+
+    total, email_forwarded, email_replied, email_blocked = (
+        db.session.query(
+            func.count(EmailLog.id),
+            func.sum(
+                case(
+                    [
+                        (
+                            and_(
+                                EmailLog.is_reply.is_(False),
+                                EmailLog.blocked.is_(False),
+                            ),
+                            1,
+                        )
+                    ],
+                    else_=0,
+                )
+            ),
+            func.sum(case([(EmailLog.is_reply.is_(True), 1)], else_=0)),
+            func.sum(case([(EmailLog.blocked.is_(True), 1)], else_=0)),
+        )
+        .join(Contact, Contact.id == EmailLog.contact_id)
+        .filter(Contact.alias_id == alias_id)
+        .one()
+    )
+    # SUM() returns NULL when the alias has no activity yet
+    stats = (total, email_forwarded or 0, email_replied or 0, email_blocked or 0)
+
+    _alias_log_stats_cache.set(alias_id, stats)
+    return stats
@@ -7,7 +7,7 @@ from app.dashboard.base import dashboard_bp
 from app.extensions import db
 from app.models import Referral
 
-_REFERRAL_PATTERN = r"[0-9a-z-_]{3,}"
+_REFERRAL_PATTERN = re.compile(r"[0-9a-z-_]{3,}")
 
 
 @dashboard_bp.route("/referral", methods=["GET", "POST"])
@@ -16,7 +16,7 @@ def referral_route():
     if request.method == "POST":
         if request.form.get("form-name") == "create":
             code = request.form.get("code")
-            if re.fullmatch(_REFERRAL_PATTERN, code) is None:
+            if _REFERRAL_PATTERN.fullmatch(code) is None:
                 flash(
                     "At least 3 characters. Only lowercase letters, "
                     "numbers, dashes (-) and underscores (_) are currently supported.",
@@ -5,13 +5,15 @@ import os
 import quopri
 import random
 import re
+import threading
 import time
+from copy import deepcopy
 from email.header import decode_header
 from email.message import Message
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.utils import make_msgid, formatdate, parseaddr
-from smtplib import SMTP, SMTPServerDisconnected
+from smtplib import SMTP, SMTPServerDisconnected, SMTPException
 from typing import Tuple, List
 
 import arrow
@@ -63,6 +65,7 @@ from app.utils import (
     convert_to_id,
     convert_to_alphanumeric,
     sanitize_email,
+    TTLCache,
 )
 
 
@@ -396,7 +399,7 @@ def add_dkim_signature(msg: Message, email_domain: str):
             to_bytes(msg),
             DKIM_SELECTOR,
             email_domain.encode(),
-            DKIM_PRIVATE_KEY.encode(),
+            DKIM_PRIVATE_KEY,
             include_headers=DKIM_HEADERS,
         )
         sig = sig.decode()
@@ -455,10 +458,27 @@ def can_create_directory_for_address(address: str) -> bool:
     return False
 
 
+# SL domains rarely change, keep them in memory for a short time
+# instead of querying them for every email
+_sl_domains_cache = TTLCache(ttl=300)
+
+
+def is_sl_domain(domain: str) -> bool:
+    """Return whether domain is one of the SimpleLogin domains (SLDomain)"""
+    sl_domains = _sl_domains_cache.get("sl_domains")
+    if sl_domains is None:
+        sl_domains = frozenset(d for (d,) in db.session.query(SLDomain.domain))
+        # a server without any SL domain isn't set up yet, don't cache
+        if sl_domains:
+            _sl_domains_cache.set("sl_domains", sl_domains)
+
+    return domain in sl_domains
+
+
 def is_valid_alias_address_domain(address) -> bool:
     """Return whether an address domain might a domain handled by SimpleLogin"""
     domain = get_email_domain_part(address)
-    if SLDomain.get_by(domain=domain):
+    if is_sl_domain(domain):
         return True
 
     if CustomDomain.get_by(domain=domain, verified=True):
@@ -690,11 +710,15 @@ def parseaddr_unicode(addr) -> (str, str):
 def copy(msg: Message) -> Message:
     """return a copy of message"""
     try:
-        # prefer the unicode way
-        return email.message_from_string(msg.as_string())
-    except (UnicodeEncodeError, KeyError, LookupError):
-        LOG.warning("as_string() fails, try to_bytes")
-        return email.message_from_bytes(to_bytes(msg))
+        # copy the message structure only, the payloads are immutable strings that can be shared.
+        # Much cheaper than serializing and re-parsing the whole message, especially with attachments
+        return deepcopy(msg)
+    except Exception:
+        LOG.warning("deepcopy fails, try to_bytes")
+
+    # parse bytes directly: going through as_string() makes a full str copy of the message
+    # and loses the 8-bit content of non-utf8 parts
+    return email.message_from_bytes(to_bytes(msg))
 
 
 def to_bytes(msg: Message):
@@ -722,7 +746,7 @@ def to_bytes(msg: Message):
 
 
 def should_add_dkim_signature(domain: str) -> bool:
-    if SLDomain.get_by(domain=domain):
+    if is_sl_domain(domain):
         return True
 
     custom_domain: CustomDomain = CustomDomain.get_by(domain=domain)
@@ -871,10 +895,13 @@ def replace(msg: Message, old, new) -> Message:
         encoding = get_encoding(msg)
         payload = msg.get_payload()
         if type(payload) is str:
+            encoded_old = encode_text(old, encoding)
+            # nothing to replace, avoid copying the message
+            if encoded_old not in payload:
+                return msg
+
             clone_msg = copy(msg)
-            new_payload = payload.replace(
-                encode_text(old, encoding), encode_text(new, encoding)
-            )
+            new_payload = payload.replace(encoded_old, encode_text(new, encoding))
             clone_msg.set_payload(new_payload)
             return clone_msg
 
@@ -887,6 +914,13 @@ def replace(msg: Message, old, new) -> Message:
         new_parts = []
         for part in msg.get_payload():
             new_parts.append(replace(part, old, new))
+
+        # no part has changed, avoid copying the message
+        if all(
+            new_part is part for new_part, part in zip(new_parts, msg.get_payload())
+        ):
+            return msg
+
         clone_msg = copy(msg)
         clone_msg.set_payload(new_parts)
         return clone_msg
@@ -895,6 +929,10 @@ def replace(msg: Message, old, new) -> Message:
     return msg
 
 
+# number of reverse-alias candidates checked per query in generate_reply_email
+_REPLY_EMAIL_BATCH_SIZE = 3
+
+
 def generate_reply_email(contact_email: str, user: User) -> str:
     """
     generate a reply_email (aka reverse-alias), make sure it isn't used by any contact
@@ -922,23 +960,40 @@ def generate_reply_email(contact_email: str, user: User) -> str:
         contact_email = contact_email.replace("@", ".at.")
         contact_email = convert_to_alphanumeric(contact_email)
 
-    # not use while to avoid infinite loop
-    for _ in range(1000):
-        if include_sender_in_reverse_alias and contact_email:
-            random_length = random.randint(5, 10)
-            reply_email = (
-                f"ra+{contact_email}+{random_string(random_length)}@{EMAIL_DOMAIN}"
+    # not use while to avoid infinite loop: try at most ~1000 candidates
+    # a candidate is almost always free: check a few of them per query,
+    # enough to make a second query unlikely without generating many random strings
+    for _ in range(1000 // _REPLY_EMAIL_BATCH_SIZE + 1):
+        candidates = [
+            _random_reply_email(contact_email, include_sender_in_reverse_alias)
+            for _i in range(_REPLY_EMAIL_BATCH_SIZE)
+        ]
+
+        used_reply_emails = {
+            r
+            for (r,) in db.session.query(Contact.reply_email).filter(
+                Contact.reply_email.in_(candidates)
             )
-        else:
-            random_length = random.randint(20, 50)
-            reply_email = f"ra+{random_string(random_length)}@{EMAIL_DOMAIN}"
+        }
 
-        if not Contact.get_by(reply_email=reply_email):
-            return reply_email
+        for reply_email in candidates:
+            if reply_email not in used_reply_emails:
+                return reply_email
 
     raise Exception("Cannot generate reply email")
 
 
+def _random_reply_email(
+    contact_email: str, include_sender_in_reverse_alias: bool
+) -> str:
+    if include_sender_in_reverse_alias and contact_email:
+        random_length = random.randint(5, 10)
+        return f"ra+{contact_email}+{random_string(random_length)}@{EMAIL_DOMAIN}"
+
+    random_length = random.randint(20, 50)
+    return f"ra+{random_string(random_length)}@{EMAIL_DOMAIN}"
+
+
 def is_reply_email(address: str) -> bool:
     return address.startswith("reply+") or address.startswith("ra+")
 
@@ -1132,6 +1187,40 @@ def spf_pass(
     return True
 
 
+# sl_sendmail is called by the email handler worker threads:
+# each thread keeps its connections to Postfix open instead of reconnecting for every email
+_smtp_local = threading.local()
+
+
+def _get_smtp(port: int) -> SMTP:
+    """return a connection to Postfix on this port, reuse the current thread's one if still alive"""
+    smtps = getattr(_smtp_local, "smtps", None)
+    if smtps is None:
+        smtps = _smtp_local.smtps = {}
+
+    smtp = smtps.get(port)
+    if smtp:
+        try:
+            code, _ = smtp.noop()
+            if code == 250:
+                return smtp
+        except (SMTPException, OSError):
+            pass
+
+        LOG.d("SMTP connection on port %s is closed, reconnect", port)
+        try:
+            smtp.close()
+        except Exception:
+            pass
+
+    smtp = SMTP(POSTFIX_SERVER, port)
+    if POSTFIX_SUBMISSION_TLS:
+        smtp.starttls()
+
+    smtps[port] = smtp
+    return smtp
+
+
 def sl_sendmail(
     from_addr,
     to_addr,
@@ -1153,13 +1242,12 @@ def sl_sendmail(
 
     try:
         if POSTFIX_SUBMISSION_TLS:
-            smtp = SMTP(POSTFIX_SERVER, 587)
-            smtp.starttls()
+            smtp = _get_smtp(587)
         else:
             if is_forward:
-                smtp = SMTP(POSTFIX_SERVER, POSTFIX_PORT_FORWARD)
+                smtp = _get_smtp(POSTFIX_PORT_FORWARD)
             else:
-                smtp = SMTP(POSTFIX_SERVER, POSTFIX_PORT)
+                smtp = _get_smtp(POSTFIX_PORT)
 
         # smtp.send_message has UnicodeEncodeError
         # encode message raw directly instead
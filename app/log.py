@@ -1,5 +1,6 @@
 import logging
 import sys
+import threading
 import time
 
 import coloredlogs
@@ -13,13 +14,13 @@ _log_format = '%(asctime)s - %(name)s - %(levelname)s - "%(pathname)s:%(lineno)d
 _log_formatter = logging.Formatter(_log_format)
 
 # used to keep track of an email lifecycle
-_MESSAGE_ID = ""
+# emails can be handled concurrently by different threads
+_message_id_local = threading.local()
 
 
 def set_message_id(message_id):
-    global _MESSAGE_ID
     print("set message_id", message_id)
-    _MESSAGE_ID = message_id
+    _message_id_local.message_id = message_id
 
 
 class EmailHandlerFilter(logging.Filter):
@@ -31,7 +32,7 @@ class EmailHandlerFilter(logging.Filter):
         return True
 
     def get_message_id(self):
-        return _MESSAGE_ID
+        return getattr(_message_id_local, "message_id", "")
 
 
 def _get_console_handler():
@@ -1,5 +1,6 @@
 import random
 import string
+import time
 import urllib.parse
 
 from unidecode import unidecode
@@ -65,3 +66,32 @@ def sanitize_email(email_address: str) -> str:
     if email_address:
         return email_address.lower().strip().replace(" ", "").replace("\n", " ")
     return email_address
+
+
+class TTLCache:
+    """In-memory cache whose entries expire after `ttl` seconds.
+    The cache is per process: each worker has its own copy.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # key -> (expiration timestamp, value)
+        self._items = {}
+
+    def get(self, key):
+        """return the cached value, None if absent or expired"""
+        item = self._items.get(key)
+        if item and item[0] > time.time():
+            return item[1]
+        return None
+
+    def set(self, key, value):
+        now = time.time()
+        # drop expired entries so the cache doesn't grow indefinitely
+        for k in [k for k, (expire_at, _) in self._items.items() if expire_at <= now]:
+            del self._items[k]
+
+        self._items[key] = (now + self.ttl, value)
+
+    def clear(self):
+        self._items.clear()
@@ -31,9 +31,11 @@ It should contain the following info:
 
 """
 import argparse
+import asyncio
 import email
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from email import encoders
 from email.encoders import encode_noop
 from email.message import Message
@@ -46,7 +48,9 @@ from typing import List, Tuple, Optional
 
 from aiosmtpd.controller import Controller
 from aiosmtpd.smtp import Envelope
+from flask import Flask
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 
 from app import pgp_utils, s3
 from app.alias_utils import try_auto_create
@@ -73,6 +77,7 @@ from app.config import (
     TRANSACTIONAL_BOUNCE_PREFIX,
     TRANSACTIONAL_BOUNCE_SUFFIX,
     ENABLE_SPAM_ASSASSIN,
+    EMAIL_HANDLER_NB_WORKER,
 )
 from app.email.spam import get_spam_score
 from app.email_utils import (
@@ -122,7 +127,7 @@ from app.models import (
 from app.pgp_utils import PGPException, sign_data_with_pgpy, sign_data
 from app.utils import sanitize_email
 from init_app import load_pgp_public_keys
-from server import create_app, create_light_app
+from server import create_light_app
 
 # forward or reply
 _DIRECTION = "X-SimpleLogin-Type"
@@ -140,22 +145,6 @@ _MIME_HEADERS = [
 _MIME_HEADERS = [h.lower() for h in _MIME_HEADERS]
 
 
-# fix the database connection leak issue
-# use this method instead of create_app
-def new_app():
-    app = create_light_app()
-
-    @app.teardown_appcontext
-    def shutdown_session(response_or_exc):
-        # same as shutdown_session() in flask-sqlalchemy but this is not enough
-        db.session.remove()
-
-        # dispose the engine too
-        db.engine.dispose()
-
-    return app
-
-
 def get_or_create_contact(from_header: str, mail_from: str, alias: Alias) -> Contact:
     """
     contact_from_header is the RFC 2047 format FROM header
@@ -193,7 +182,6 @@ def get_or_create_contact(from_header: str, mail_from: str, alias: Alias) -> Con
                 contact_name,
             )
             contact.name = contact_name
-            db.session.commit()
 
         # contact created in the past does not have mail_from and from_header field
         if not contact.mail_from and mail_from:
@@ -204,7 +192,6 @@ def get_or_create_contact(from_header: str, mail_from: str, alias: Alias) -> Con
                 mail_from,
             )
             contact.mail_from = mail_from
-            db.session.commit()
 
         if not contact.from_header and from_header:
             LOG.d(
@@ -214,6 +201,9 @@ def get_or_create_contact(from_header: str, mail_from: str, alias: Alias) -> Con
                 from_header,
             )
             contact.from_header = from_header
+
+        # save all the changes at once, nothing to commit in the usual case of an unchanged contact
+        if db.session.is_modified(contact):
             db.session.commit()
     else:
         LOG.d(
@@ -475,7 +465,8 @@ def handle_forward(envelope, msg: Message, rcpt_to: str) -> List[Tuple[bool, str
     """
     address = rcpt_to  # alias@SL
 
-    alias = Alias.get_by(email=address)
+    # alias.user is always needed, load it in the same query
+    alias = Alias.query.options(joinedload(Alias.user)).filter_by(email=address).first()
     if not alias:
         LOG.d("alias %s not exist. Try to see if it can be created on the fly", address)
         alias = try_auto_create(address)
@@ -497,13 +488,12 @@ def handle_forward(envelope, msg: Message, rcpt_to: str) -> List[Tuple[bool, str
             handle_email_sent_to_ourself(alias, mb, msg, user)
             return [(True, "250 Message accepted for delivery")]
 
-    LOG.d("Create or get contact for from:%s reply-to:%s", msg["From"], msg["Reply-To"])
+    # each header access scans all the message headers, look them up once
+    orig_from, orig_reply_to = msg["From"], msg["Reply-To"]
+    LOG.d("Create or get contact for from:%s reply-to:%s", orig_from, orig_reply_to)
     # prefer using Reply-To when creating contact
-    if msg["Reply-To"]:
-        # force convert header to string, sometimes contact_from_header is Header object
-        from_header = str(msg["Reply-To"])
-    else:
-        from_header = str(msg["From"])
+    # force convert header to string, sometimes contact_from_header is Header object
+    from_header = str(orig_reply_to) if orig_reply_to else str(orig_from)
 
     contact = get_or_create_contact(from_header, envelope.mail_from, alias)
 
@@ -512,7 +502,6 @@ def handle_forward(envelope, msg: Message, rcpt_to: str) -> List[Tuple[bool, str
         EmailLog.create(
             contact_id=contact.id, user_id=contact.user_id, blocked=True, commit=True
         )
-        db.session.commit()
         # do not return 5** to allow user to receive emails later when alias is enabled
         return [(True, "250 Message accepted for delivery")]
 
@@ -764,7 +753,12 @@ def handle_reply(envelope, msg: Message, rcpt_to: str) -> (bool, str):
     # handle case where reply email is generated with non-allowed char
     reply_email = normalize_reply_email(reply_email)
 
-    contact = Contact.get_by(reply_email=reply_email)
+    # contact.alias and alias.user are always needed, load them in the same query
+    contact = (
+        Contact.query.options(joinedload(Contact.alias).joinedload(Alias.user))
+        .filter_by(reply_email=reply_email)
+        .first()
+    )
     if not contact:
         LOG.w(f"No such forward-email with {reply_email} as reply-email")
         return False, "550 SL E4 Email not exist"
@@ -1614,9 +1608,18 @@ def handle(envelope: Envelope) -> str:
 
 
 class MailHandler:
+    def __init__(self, app: Flask):
+        # the app (and its database connection pool) is shared by all messages
+        self._app = app
+        # handle() is blocking (database, Postfix, SpamAssassin, S3...)
+        # run it in a thread pool so the event loop can keep accepting new messages
+        self._executor = ThreadPoolExecutor(max_workers=EMAIL_HANDLER_NB_WORKER)
+
     async def handle_DATA(self, server, session, envelope: Envelope):
         try:
-            ret = self._handle(envelope)
+            ret = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._handle, envelope
+            )
             return ret
         except Exception:
             LOG.exception(
@@ -1638,8 +1641,8 @@ class MailHandler:
         message_id = str(uuid.uuid4())
         set_message_id(message_id)
 
-        app = new_app()
-        with app.app_context():
+        # flask-sqlalchemy returns the session's connection to the pool on app context teardown
+        with self._app.app_context():
             ret = handle(envelope)
             LOG.i("takes %s seconds <<===", time.time() - start)
             return ret
@@ -1647,14 +1650,14 @@ class MailHandler:
 
 def main(port: int):
     """Use aiosmtpd Controller"""
-    controller = Controller(MailHandler(), hostname="0.0.0.0", port=port)
+    app = create_light_app()
+    controller = Controller(MailHandler(app), hostname="0.0.0.0", port=port)
 
     controller.start()
     LOG.d("Start mail controller %s %s", controller.hostname, controller.port)
 
     if LOAD_PGP_EMAIL_HANDLER:
         LOG.w("LOAD PGP keys")
-        app = create_app()
         with app.app_context():
             load_pgp_public_keys()
 
@@ -0,0 +1,7 @@
+# gunicorn loads ./gunicorn.conf.py by default
+from app.config import FLASK_PROFILER_PATH
+
+# build the app once in the master process so workers share it instead of each rebuilding it.
+# flask-profiler opens its SQLite database when the app is created and a SQLite connection
+# can't be used across fork(): create the app in each worker when the profiler is enabled
+preload_app = not FLASK_PROFILER_PATH
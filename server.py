@@ -1,12 +1,11 @@
 import json
 import os
-from datetime import timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta, date
+from io import BytesIO
 
 import arrow
-import flask_profiler
-import sentry_sdk
-from coinbase_commerce.error import WebhookInvalidPayload, SignatureVerificationError
-from coinbase_commerce.webhook import Webhook
 from flask import (
     Flask,
     redirect,
@@ -17,29 +16,22 @@ from flask import (
     flash,
     session,
     g,
+    current_app,
+    Response,
 )
-from flask_admin import Admin
 from flask_cors import cross_origin, CORS
 from flask_login import current_user
-from sentry_sdk.integrations.flask import FlaskIntegration
-from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 from app import paddle_utils, s3, config
-from app.admin_model import (
-    SLAdminIndexView,
-    UserAdmin,
-    EmailLogAdmin,
-    AliasAdmin,
-    MailboxAdmin,
-    LifetimeCouponAdmin,
-    ManualSubscriptionAdmin,
-    ClientAdmin,
-)
 from app.api.base import api_bp
 from app.auth.base import auth_bp
 from app.config import (
     DB_URI,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
     FLASK_SECRET,
     SENTRY_DSN,
     URL,
@@ -100,7 +92,14 @@ from app.monitor.base import monitor_bp
 from app.oauth.base import oauth_bp
 from app.pgp_utils import load_public_key
 
+# Optional or rarely used modules (sentry, flask-profiler, coinbase, admin) are imported where they are used:
+# this module is also imported by the email handler and the cron/job scripts that never need them
+
 if SENTRY_DSN:
+    import sentry_sdk
+    from sentry_sdk.integrations.flask import FlaskIntegration
+    from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
+
     LOG.d("enable sentry")
     sentry_sdk.init(
         dsn=SENTRY_DSN,
@@ -115,10 +114,24 @@ if SENTRY_DSN:
 os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
 
 
-def create_light_app() -> Flask:
-    app = Flask(__name__)
+def set_db_config(app: Flask):
     app.config["SQLALCHEMY_DATABASE_URI"] = DB_URI
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # SQLite uses its own pool that doesn't take these options
+    if not DB_URI.startswith("sqlite"):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            # check the connection before using it so a connection closed by the database doesn't fail a request
+            "pool_pre_ping": True,
+        }
+
+
+def create_light_app() -> Flask:
+    app = Flask(__name__)
+    set_db_config(app)
 
     db.init_app(app)
 
@@ -133,8 +146,7 @@ def create_app() -> Flask:
 
     app.url_map.strict_slashes = False
 
-    app.config["SQLALCHEMY_DATABASE_URI"] = DB_URI
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    set_db_config(app)
     # enable to print all queries generated by sqlalchemy
     # app.config["SQLALCHEMY_ECHO"] = True
 
@@ -167,6 +179,8 @@ def create_app() -> Flask:
     setup_do_not_track(app)
 
     if FLASK_PROFILER_PATH:
+        import flask_profiler
+
         LOG.d("Enable flask-profiler")
         app.config["flask_profiler"] = {
             "enabled": True,
@@ -185,10 +199,11 @@ def create_app() -> Flask:
 
     # set session to permanent so user stays signed in after quitting the browser
     # the cookie is valid for 7 days
+    app.permanent_session_lifetime = timedelta(days=7)
+
     @app.before_request
     def make_session_permanent():
         session.permanent = True
-        app.permanent_session_lifetime = timedelta(days=7)
 
     return app
 
@@ -203,6 +218,11 @@ def fake_data():
     # Create all tables
     db.create_all()
 
+    now = arrow.now()
+
+    # everything is created in a single transaction, committed at the end
+    # flush() is used instead of commit() when an object id is needed
+
     # Create a user
     user = User.create(
         email="john@wick.com",
@@ -216,52 +236,63 @@ def fake_data():
         fido_uuid=None,
     )
     user.trial_end = None
-    db.session.commit()
+
+    # files are uploaded in the background while the database objects are created,
+    # one worker per file
+    upload_executor = ThreadPoolExecutor(max_workers=2)
 
     # add a profile picture
     file_path = "profile_pic.svg"
-    s3.upload_from_bytesio(
-        file_path,
-        open(os.path.join(ROOT_DIR, "static", "default-icon.svg"), "rb"),
-        content_type="image/svg",
-    )
-    file = File.create(user_id=user.id, path=file_path, commit=True)
+    with open(os.path.join(ROOT_DIR, "static", "default-icon.svg"), "rb") as f:
+        profile_pic = BytesIO(f.read())
+    uploads = [
+        upload_executor.submit(
+            s3.upload_from_bytesio,
+            file_path,
+            profile_pic,
+            content_type="image/svg",
+        )
+    ]
+    file = File.create(user_id=user.id, path=file_path)
+    db.session.flush()
     user.profile_picture_id = file.id
-    db.session.commit()
 
     # create a bounced email
     alias = Alias.create_new_random(user)
-    db.session.commit()
 
     bounce_email_file_path = "bounce.eml"
-    s3.upload_email_from_bytesio(
-        bounce_email_file_path,
-        open(os.path.join(ROOT_DIR, "local_data", "email_tests", "2.eml"), "rb"),
-        "download.eml",
+    with open(os.path.join(ROOT_DIR, "local_data", "email_tests", "2.eml"), "rb") as f:
+        bounce_email = BytesIO(f.read())
+    uploads.append(
+        upload_executor.submit(
+            s3.upload_email_from_bytesio,
+            bounce_email_file_path,
+            bounce_email,
+            "download.eml",
+        )
     )
     refused_email = RefusedEmail.create(
         path=bounce_email_file_path,
         full_report_path=bounce_email_file_path,
         user_id=user.id,
-        commit=True,
     )
+    db.session.flush()
 
     contact = Contact.create(
         user_id=user.id,
         alias_id=alias.id,
         website_email="hey@google.com",
         reply_email="rep@sl.local",
-        commit=True,
     )
+    db.session.flush()
     EmailLog.create(
         user_id=user.id,
         contact_id=contact.id,
         refused_email_id=refused_email.id,
         bounced=True,
-        commit=True,
     )
 
-    LifetimeCoupon.create(code="coupon", nb_used=10, commit=True)
+    LifetimeCoupon.create(code="coupon", nb_used=10)
 
     # Create a subscription for user
     Subscription.create(
@@ -269,15 +300,12 @@ def fake_data():
         cancel_url="https://checkout.paddle.com/subscription/cancel?user=1234",
         update_url="https://checkout.paddle.com/subscription/update?user=1234",
         subscription_id="123",
-        event_time=arrow.now(),
-        next_bill_date=arrow.now().shift(days=10).date(),
+        event_time=now,
+        next_bill_date=now.shift(days=10).date(),
         plan=PlanEnum.monthly,
-        commit=True,
     )
 
-    CoinbaseSubscription.create(
-        user_id=user.id, end_at=arrow.now().shift(days=10), commit=True
-    )
+    CoinbaseSubscription.create(user_id=user.id, end_at=now.shift(days=10))
 
     api_key = ApiKey.create(user_id=user.id, name="Chrome")
     api_key.code = "code"
@@ -293,7 +321,7 @@ def fake_data():
         pgp_public_key=pgp_public_key,
     )
     m1.pgp_finger_print = load_public_key(pgp_public_key)
-    db.session.commit()
+    db.session.flush()
 
     for i in range(3):
         if i % 2 == 0:
@@ -306,14 +334,14 @@ def fake_data():
                 user_id=user.id,
                 mailbox_id=user.default_mailbox_id,
             )
-        db.session.commit()
 
         if i % 5 == 0:
+            # the alias id is only needed here
+            db.session.flush()
             if i % 2 == 0:
                 AliasMailbox.create(alias_id=a.id, mailbox_id=user.default_mailbox_id)
             else:
                 AliasMailbox.create(alias_id=a.id, mailbox_id=m1.id)
-        db.session.commit()
 
         # some aliases don't have any activity
         # if i % 3 != 0:
@@ -331,17 +359,15 @@ def fake_data():
         # have some disabled alias
         if i % 5 == 0:
             a.enabled = False
-            db.session.commit()
 
     custom_domain1 = CustomDomain.create(user_id=user.id, domain="ab.cd", verified=True)
-    db.session.commit()
+    db.session.flush()
 
     Alias.create(
         user_id=user.id,
         email="first@ab.cd",
         mailbox_id=user.default_mailbox_id,
         custom_domain_id=custom_domain1.id,
-        commit=True,
     )
 
     Alias.create(
@@ -349,18 +375,16 @@ def fake_data():
         email="second@ab.cd",
         mailbox_id=user.default_mailbox_id,
         custom_domain_id=custom_domain1.id,
-        commit=True,
     )
 
     Directory.create(user_id=user.id, name="abcd")
     Directory.create(user_id=user.id, name="xyzt")
-    db.session.commit()
 
     # Create a client
     client1 = Client.create_new(name="Demo", user_id=user.id)
     client1.oauth_client_id = "client-id"
     client1.oauth_client_secret = "client-secret"
-    db.session.commit()
+    db.session.flush()
 
     RedirectUri.create(
         client_id=client1.id, uri="https://your-website.com/oauth-callback"
@@ -369,16 +393,18 @@ def fake_data():
     client2 = Client.create_new(name="Demo 2", user_id=user.id)
     client2.oauth_client_id = "client-id2"
     client2.oauth_client_secret = "client-secret2"
-    db.session.commit()
 
     ClientUser.create(user_id=user.id, client_id=client1.id, name="Fake Name")
 
     referral = Referral.create(user_id=user.id, code="REFCODE", name="First referral")
-    db.session.commit()
+    db.session.flush()
 
-    for i in range(6):
-        Notification.create(user_id=user.id, message=f"""Hey hey <b>{i}</b> """ * 10)
-    db.session.commit()
+    db.session.bulk_save_objects(
+        [
+            Notification(user_id=user.id, message=f"""Hey hey <b>{i}</b> """ * 10)
+            for i in range(6)
+        ]
+    )
 
     user2 = User.create(
         email="winston@continental.com",
@@ -387,15 +413,20 @@ def fake_data():
         referral_id=referral.id,
     )
     Mailbox.create(user_id=user2.id, email="winston2@high.table", verified=True)
-    db.session.commit()
 
     ManualSubscription.create(
         user_id=user2.id,
-        end_at=arrow.now().shift(years=1, days=1),
+        end_at=now.shift(years=1, days=1),
         comment="Local manual",
-        commit=True,
     )
 
+    db.session.commit()
+
+    # wait for the uploads, re-raise their error if any
+    for upload in uploads:
+        upload.result()
+    upload_executor.shutdown()
+
 
 @login_manager.user_loader
 def load_user(user_id):
@@ -413,12 +444,26 @@ def register_blueprints(app: Flask):
     app.register_blueprint(developer_bp)
 
     app.register_blueprint(oauth_bp, url_prefix="/oauth")
-    app.register_blueprint(oauth_bp, url_prefix="/oauth2")
+    # /oauth2 is an alias of /oauth: add its rules to the same endpoints
+    # instead of registering the blueprint a second time
+    for rule in list(app.url_map.iter_rules()):
+        if rule.endpoint.startswith(oauth_bp.name + "."):
+            app.add_url_rule(
+                "/oauth2" + rule.rule[len("/oauth") :],
+                endpoint=rule.endpoint,
+                view_func=app.view_functions[rule.endpoint],
+                # HEAD and OPTIONS are added automatically
+                methods=rule.methods - {"HEAD", "OPTIONS"},
+            )
 
     app.register_blueprint(discover_bp)
     app.register_blueprint(api_bp)
 
 
+# static files and debug toolbar requests aren't logged
+_NOT_LOGGED_PATH_PREFIXES = ("/static", "/admin/static", "/_debug_toolbar")
+
+
 def set_index_page(app):
     @app.route("/", methods=["GET", "POST"])
     def index():
@@ -429,12 +474,7 @@ def set_index_page(app):
 
     @app.after_request
     def after_request(res):
-        # not logging /static call
-        if (
-            not request.path.startswith("/static")
-            and not request.path.startswith("/admin/static")
-            and not request.path.startswith("/_debug_toolbar")
-        ):
+        if not request.path.startswith(_NOT_LOGGED_PATH_PREFIXES):
             LOG.debug(
                 "%s %s %s %s %s",
                 request.remote_addr,
@@ -448,10 +488,9 @@ def set_index_page(app):
 
 
 def setup_openid_metadata(app):
-    @app.route("/.well-known/openid-configuration")
-    @cross_origin()
-    def openid_config():
-        res = {
+    # the metadata only depends on the config: serialize it once
+    openid_config_json = json.dumps(
+        {
             "issuer": URL,
             "authorization_endpoint": URL + "/oauth2/authorize",
             "token_endpoint": URL + "/oauth2/token",
@@ -470,34 +509,54 @@ def setup_openid_metadata(app):
             # "introspection_endpoint": URL + "/oauth2/token/introspection",
             # "revocation_endpoint": URL + "/oauth2/token/revocation",
         }
+    )
 
-        return jsonify(res)
+    @app.route("/.well-known/openid-configuration")
+    @cross_origin()
+    def openid_config():
+        # OIDC clients fetch the metadata on every login, let them and proxies cache it
+        return Response(
+            openid_config_json,
+            mimetype="application/json",
+            headers={"Cache-Control": "public, max-age=3600"},
+        )
+
+    # the key is loaded once at startup too
+    jwks_json = json.dumps({"keys": [get_jwk_key()]})
 
     @app.route("/jwks")
     @cross_origin()
     def jwks():
-        res = {"keys": [get_jwk_key()]}
-        return jsonify(res)
+        return Response(
+            jwks_json,
+            mimetype="application/json",
+            # shorter than the metadata so a key rotation is picked up quickly
+            headers={"Cache-Control": "public, max-age=300"},
+        )
 
 
 def get_current_user():
-    try:
-        return g.user
-    except AttributeError:
-        return current_user
+    # g.user is set for API requests
+    return g.get("user", current_user)
+
+
+def _is_api_request() -> bool:
+    # 404 and 405 are raised before any blueprint is matched, so the api
+    # blueprint cannot have its own error handlers: dispatch on the path
+    return request.path.startswith("/api/")
 
 
 def setup_error_page(app):
     @app.errorhandler(400)
     def bad_request(e):
-        if request.path.startswith("/api/"):
+        if _is_api_request():
             return jsonify(error="Bad Request"), 400
         else:
             return render_template("error/400.html"), 400
 
     @app.errorhandler(401)
     def unauthorized(e):
-        if request.path.startswith("/api/"):
+        if _is_api_request():
             return jsonify(error="Unauthorized"), 401
         else:
             flash("You need to login to see this page", "error")
@@ -505,7 +564,7 @@ def setup_error_page(app):
 
     @app.errorhandler(403)
     def forbidden(e):
-        if request.path.startswith("/api/"):
+        if _is_api_request():
             return jsonify(error="Forbidden"), 403
         else:
             return render_template("error/403.html"), 403
@@ -517,21 +576,21 @@ def setup_error_page(app):
             request.path,
             get_current_user(),
         )
-        if request.path.startswith("/api/"):
+        if _is_api_request():
             return jsonify(error="Rate limit exceeded"), 429
         else:
             return render_template("error/429.html"), 429
 
     @app.errorhandler(404)
     def page_not_found(e):
-        if request.path.startswith("/api/"):
+        if _is_api_request():
             return jsonify(error="No such endpoint"), 404
         else:
             return render_template("error/404.html"), 404
 
     @app.errorhandler(405)
     def wrong_method(e):
-        if request.path.startswith("/api/"):
+        if _is_api_request():
             return jsonify(error="Method not allowed"), 405
         else:
             return render_template("error/405.html"), 405
@@ -539,7 +598,7 @@ def setup_error_page(app):
     @app.errorhandler(Exception)
     def error_handler(e):
         LOG.exception(e)
-        if request.path.startswith("/api/"):
+        if _is_api_request():
             return jsonify(error="Internal error"), 500
         else:
             return render_template("error/500.html"), 500
@@ -561,7 +620,8 @@ def jinja2_filter(app):
     @app.context_processor
     def inject_stage_and_region():
         return dict(
-            YEAR=arrow.now().year,
+            # date.today() avoids building a timezone-aware arrow object on every render
+            YEAR=date.today().year,
             URL=URL,
             SENTRY_DSN=SENTRY_FRONT_END_DSN,
             VERSION=SHA1,
@@ -578,163 +638,229 @@ def jinja2_filter(app):
         )
 
 
+# the payment providers only wait for the webhook response, not for the emails we send them
+_webhook_email_executor = ThreadPoolExecutor(max_workers=8)
+
+
+def send_webhook_email(to_email, subject, plaintext, html=None):
+    """send the email in the background so the webhook can be acknowledged right away.
+    Must be called inside the app context, the templates must be rendered beforehand.
+    """
+    _webhook_email_executor.submit(
+        _send_email_with_retry,
+        current_app._get_current_object(),
+        to_email,
+        subject,
+        plaintext,
+        html,
+    )
+
+
+def _send_email_with_retry(
+    app: Flask, to_email, subject, plaintext, html, max_attempt=3
+):
+    # send_email needs the database
+    with app.app_context():
+        for attempt in range(max_attempt):
+            try:
+                send_email(to_email, subject, plaintext, html)
+                return
+            except Exception:
+                if attempt == max_attempt - 1:
+                    LOG.exception("Cannot send email %s to %s", subject, to_email)
+                    return
+
+                LOG.w(
+                    "Cannot send email %s to %s, retry in %s seconds",
+                    subject,
+                    to_email,
+                    2**attempt,
+                )
+                time.sleep(2**attempt)
+
+
+def handle_paddle_subscription_created(form):
+    """new user subscribes"""
+    # the passthrough is json encoded, e.g.
+    # form.get("passthrough") = '{"user_id": 88 }'
+    passthrough = json.loads(form.get("passthrough"))
+    user_id = passthrough.get("user_id")
+    user = User.get(user_id)
+
+    subscription_plan_id = int(form.get("subscription_plan_id"))
+
+    if subscription_plan_id in PADDLE_MONTHLY_PRODUCT_IDS:
+        plan = PlanEnum.monthly
+    elif subscription_plan_id in PADDLE_YEARLY_PRODUCT_IDS:
+        plan = PlanEnum.yearly
+    else:
+        LOG.exception(
+            "Unknown subscription_plan_id %s %s",
+            subscription_plan_id,
+            form,
+        )
+        return "No such subscription", 400
+
+    cancel_url = form.get("cancel_url")
+    update_url = form.get("update_url")
+    subscription_id = form.get("subscription_id")
+    next_bill_date = arrow.get(form.get("next_bill_date"), "YYYY-MM-DD").date()
+
+    sub = Subscription.get_by(user_id=user.id)
+
+    if not sub:
+        LOG.d(f"create a new Subscription for user {user}")
+        Subscription.create(
+            user_id=user.id,
+            cancel_url=cancel_url,
+            update_url=update_url,
+            subscription_id=subscription_id,
+            event_time=arrow.now(),
+            next_bill_date=next_bill_date,
+            plan=plan,
+        )
+    else:
+        LOG.d(f"Update an existing Subscription for user {user}")
+        sub.cancel_url = cancel_url
+        sub.update_url = update_url
+        sub.subscription_id = subscription_id
+        sub.event_time = arrow.now()
+        sub.next_bill_date = next_bill_date
+        sub.plan = plan
+
+        # make sure to set the new plan as not-cancelled
+        # in case user cancels a plan and subscribes a new plan
+        sub.cancelled = False
+
+    LOG.debug("User %s upgrades!", user)
+
+    db.session.commit()
+    return "OK"
+
+
+def handle_paddle_subscription_payment_succeeded(form):
+    subscription_id = form.get("subscription_id")
+    LOG.debug("Update subscription %s", subscription_id)
+
+    sub: Subscription = Subscription.get_by(subscription_id=subscription_id)
+    # when user subscribes, the "subscription_payment_succeeded" can arrive BEFORE "subscription_created"
+    # at that time, subscription object does not exist yet
+    if sub:
+        sub.event_time = arrow.now()
+        sub.next_bill_date = arrow.get(form.get("next_bill_date"), "YYYY-MM-DD").date()
+
+        db.session.commit()
+
+    return "OK"
+
+
+def handle_paddle_subscription_cancelled(form):
+    subscription_id = form.get("subscription_id")
+
+    sub: Subscription = Subscription.get_by(subscription_id=subscription_id)
+    if not sub:
+        return "No such subscription", 400
+
+    cancellation_effective_date = form.get("cancellation_effective_date")
+    # cancellation_effective_date should be the same as next_bill_date
+    LOG.warning(
+        "Cancel subscription %s %s on %s, next bill date %s",
+        subscription_id,
+        sub.user,
+        cancellation_effective_date,
+        sub.next_bill_date,
+    )
+    sub.event_time = arrow.now()
+
+    sub.cancelled = True
+    db.session.commit()
+
+    user = sub.user
+
+    send_webhook_email(
+        user.email,
+        "SimpleLogin - what can we do to improve the product?",
+        render(
+            "transactional/subscription-cancel.txt",
+            end_date=cancellation_effective_date,
+        ),
+    )
+
+    return "OK"
+
+
+def handle_paddle_subscription_updated(form):
+    subscription_id = form.get("subscription_id")
+
+    sub: Subscription = Subscription.get_by(subscription_id=subscription_id)
+    if not sub:
+        return "No such subscription", 400
+
+    LOG.debug(
+        "Update subscription %s %s on %s, next bill date %s",
+        subscription_id,
+        sub.user,
+        form.get("cancellation_effective_date"),
+        sub.next_bill_date,
+    )
+    if int(form.get("subscription_plan_id")) == PADDLE_MONTHLY_PRODUCT_ID:
+        plan = PlanEnum.monthly
+    else:
+        plan = PlanEnum.yearly
+
+    sub.cancel_url = form.get("cancel_url")
+    sub.update_url = form.get("update_url")
+    sub.event_time = arrow.now()
+    sub.next_bill_date = arrow.get(form.get("next_bill_date"), "YYYY-MM-DD").date()
+    sub.plan = plan
+
+    # make sure to set the new plan as not-cancelled
+    sub.cancelled = False
+
+    db.session.commit()
+    return "OK"
+
+
+# Paddle alert_name -> handler, other alerts are ignored
+_PADDLE_HANDLERS = {
+    "subscription_created": handle_paddle_subscription_created,
+    "subscription_payment_succeeded": handle_paddle_subscription_payment_succeeded,
+    "subscription_cancelled": handle_paddle_subscription_cancelled,
+    "subscription_updated": handle_paddle_subscription_updated,
+}
+
+
 def setup_paddle_callback(app: Flask):
     @app.route("/paddle", methods=["GET", "POST"])
     def paddle():
-        LOG.debug(f"paddle callback {request.form.get('alert_name')} {request.form}")
+        form = request.form
+        alert_name = form.get("alert_name")
+        LOG.debug(f"paddle callback {alert_name} {form}")
 
         # make sure the request comes from Paddle
-        if not paddle_utils.verify_incoming_request(dict(request.form)):
-            LOG.exception(
-                "request not coming from paddle. Request data:%s", dict(request.form)
-            )
+        form_dict = form.to_dict()
+        if not paddle_utils.verify_incoming_request(form_dict):
+            LOG.exception("request not coming from paddle. Request data:%s", form_dict)
             return "KO", 400
 
-        if (
-            request.form.get("alert_name") == "subscription_created"
-        ):  # new user subscribes
-            # the passthrough is json encoded, e.g.
-            # request.form.get("passthrough") = '{"user_id": 88 }'
-            passthrough = json.loads(request.form.get("passthrough"))
-            user_id = passthrough.get("user_id")
-            user = User.get(user_id)
-
-            subscription_plan_id = int(request.form.get("subscription_plan_id"))
-
-            if subscription_plan_id in PADDLE_MONTHLY_PRODUCT_IDS:
-                plan = PlanEnum.monthly
-            elif subscription_plan_id in PADDLE_YEARLY_PRODUCT_IDS:
-                plan = PlanEnum.yearly
-            else:
-                LOG.exception(
-                    "Unknown subscription_plan_id %s %s",
-                    subscription_plan_id,
-                    request.form,
-                )
-                return "No such subscription", 400
-
-            sub = Subscription.get_by(user_id=user.id)
-
-            if not sub:
-                LOG.d(f"create a new Subscription for user {user}")
-                Subscription.create(
-                    user_id=user.id,
-                    cancel_url=request.form.get("cancel_url"),
-                    update_url=request.form.get("update_url"),
-                    subscription_id=request.form.get("subscription_id"),
-                    event_time=arrow.now(),
-                    next_bill_date=arrow.get(
-                        request.form.get("next_bill_date"), "YYYY-MM-DD"
-                    ).date(),
-                    plan=plan,
-                )
-            else:
-                LOG.d(f"Update an existing Subscription for user {user}")
-                sub.cancel_url = request.form.get("cancel_url")
-                sub.update_url = request.form.get("update_url")
-                sub.subscription_id = request.form.get("subscription_id")
-                sub.event_time = arrow.now()
-                sub.next_bill_date = arrow.get(
-                    request.form.get("next_bill_date"), "YYYY-MM-DD"
-                ).date()
-                sub.plan = plan
-
-                # make sure to set the new plan as not-cancelled
-                # in case user cancels a plan and subscribes a new plan
-                sub.cancelled = False
-
-            LOG.debug("User %s upgrades!", user)
-
-            db.session.commit()
-
-        elif request.form.get("alert_name") == "subscription_payment_succeeded":
-            subscription_id = request.form.get("subscription_id")
-            LOG.debug("Update subscription %s", subscription_id)
-
-            sub: Subscription = Subscription.get_by(subscription_id=subscription_id)
-            # when user subscribes, the "subscription_payment_succeeded" can arrive BEFORE "subscription_created"
-            # at that time, subscription object does not exist yet
-            if sub:
-                sub.event_time = arrow.now()
-                sub.next_bill_date = arrow.get(
-                    request.form.get("next_bill_date"), "YYYY-MM-DD"
-                ).date()
-
-                db.session.commit()
-
-        elif request.form.get("alert_name") == "subscription_cancelled":
-            subscription_id = request.form.get("subscription_id")
-
-            sub: Subscription = Subscription.get_by(subscription_id=subscription_id)
-            if sub:
-                # cancellation_effective_date should be the same as next_bill_date
-                LOG.warning(
-                    "Cancel subscription %s %s on %s, next bill date %s",
-                    subscription_id,
-                    sub.user,
-                    request.form.get("cancellation_effective_date"),
-                    sub.next_bill_date,
-                )
-                sub.event_time = arrow.now()
-
-                sub.cancelled = True
-                db.session.commit()
-
-                user = sub.user
-
-                send_email(
-                    user.email,
-                    "SimpleLogin - what can we do to improve the product?",
-                    render(
-                        "transactional/subscription-cancel.txt",
-                        end_date=request.form.get("cancellation_effective_date"),
-                    ),
-                )
+        handler = _PADDLE_HANDLERS.get(alert_name)
+        if handler:
+            return handler(form)
 
-            else:
-                return "No such subscription", 400
-        elif request.form.get("alert_name") == "subscription_updated":
-            subscription_id = request.form.get("subscription_id")
-
-            sub: Subscription = Subscription.get_by(subscription_id=subscription_id)
-            if sub:
-                LOG.debug(
-                    "Update subscription %s %s on %s, next bill date %s",
-                    subscription_id,
-                    sub.user,
-                    request.form.get("cancellation_effective_date"),
-                    sub.next_bill_date,
-                )
-                if (
-                    int(request.form.get("subscription_plan_id"))
-                    == PADDLE_MONTHLY_PRODUCT_ID
-                ):
-                    plan = PlanEnum.monthly
-                else:
-                    plan = PlanEnum.yearly
-
-                sub.cancel_url = request.form.get("cancel_url")
-                sub.update_url = request.form.get("update_url")
-                sub.event_time = arrow.now()
-                sub.next_bill_date = arrow.get(
-                    request.form.get("next_bill_date"), "YYYY-MM-DD"
-                ).date()
-                sub.plan = plan
-
-                # make sure to set the new plan as not-cancelled
-                sub.cancelled = False
-
-                db.session.commit()
-            else:
-                return "No such subscription", 400
         return "OK"
 
 
 def setup_coinbase_commerce(app):
     @app.route("/coinbase", methods=["POST"])
     def coinbase_webhook():
+        from coinbase_commerce.error import (
+            WebhookInvalidPayload,
+            SignatureVerificationError,
+        )
+        from coinbase_commerce.webhook import Webhook
+
         # event payload
-        request_data = request.data.decode("utf-8")
+        request_data = request.get_data(cache=False, as_text=True)
         # webhook signature
         request_sig = request.headers.get("X-CC-Webhook-Signature", None)
 
@@ -775,7 +901,7 @@ def handle_coinbase_event(event) -> bool:
         coinbase_subscription = CoinbaseSubscription.create(
             user_id=user_id, end_at=arrow.now().shift(years=1), code=code, commit=True
         )
-        send_email(
+        send_webhook_email(
             user.email,
             "Your SimpleLogin account has been upgraded",
             render(
@@ -799,7 +925,7 @@ def handle_coinbase_event(event) -> bool:
 
         db.session.commit()
 
-        send_email(
+        send_webhook_email(
             user.email,
             "Your SimpleLogin account has been extended",
             render(
@@ -822,6 +948,19 @@ def init_extensions(app: Flask):
 
 
 def init_admin(app):
+    from flask_admin import Admin
+
+    from app.admin_model import (
+        SLAdminIndexView,
+        UserAdmin,
+        EmailLogAdmin,
+        AliasAdmin,
+        MailboxAdmin,
+        LifetimeCouponAdmin,
+        ManualSubscriptionAdmin,
+        ClientAdmin,
+    )
+
     admin = Admin(name="SimpleLogin", template_mode="bootstrap4")
 
     admin.init_app(app, index_view=SLAdminIndexView())
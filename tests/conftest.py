@@ -13,11 +13,18 @@ os.environ["DB_URI"] = "sqlite://"
 
 import pytest
 
+from app.dashboard.views.alias_log import _alias_log_stats_cache
 from app.extensions import db
 from server import create_app
 from init_app import add_sl_domains
 
 
+@pytest.fixture(autouse=True)
+def reset_alias_log_stats_cache():
+    # the cache is process-wide but each test has a new database that reuses the same ids
+    _alias_log_stats_cache.clear()
+
+
 @pytest.fixture
 def flask_app():
     app = create_app()
@@ -1,8 +1,11 @@
 from flask import url_for
 
+from app.dashboard.views.alias_contact_manager import get_contact_infos
+from app.extensions import db
 from app.models import (
     Alias,
     Contact,
+    EmailLog,
 )
 from tests.utils import login
 
@@ -55,3 +58,39 @@ def test_add_contact_success(flask_client):
     # no new contact is added
     assert Contact.query.count() == 2
     assert "Invalid email format. Email must be either email@example.com" in str(r.data)
+
+
+def test_get_contact_infos(flask_client):
+    user = login(flask_client)
+    alias = Alias.first()
+    contacts = [
+        Contact.create(
+            user_id=user.id,
+            alias_id=alias.id,
+            website_email=f"contact{i}@example.com",
+            reply_email=f"rep{i}@sl.local",
+        )
+        for i in range(3)
+    ]
+    db.session.commit()
+    EmailLog.create(user_id=user.id, contact_id=contacts[1].id)
+    EmailLog.create(user_id=user.id, contact_id=contacts[1].id, is_reply=True)
+    EmailLog.create(user_id=user.id, contact_id=contacts[2].id, commit=True)
+
+    assert len(get_contact_infos(alias)) == 3
+
+    # only the highlighted contact
+    contact_infos = get_contact_infos(alias, contact_id=contacts[1].id)
+    assert len(contact_infos) == 1
+    assert contact_infos[0].contact.id == contacts[1].id
+    assert contact_infos[0].nb_forward == 1
+    assert contact_infos[0].nb_reply == 1
+
+    r = flask_client.get(
+        url_for(
+            "dashboard.alias_contact_manager",
+            alias_id=alias.id,
+            highlight_contact_id=contacts[0].id,
+        )
+    )
+    assert r.status_code == 200
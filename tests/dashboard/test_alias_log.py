@@ -0,0 +1,145 @@
+import time
+
+from flask import url_for
+
+from app.config import PAGE_LIMIT
+from app.dashboard.views.alias_log import (
+    get_alias_log,
+    get_alias_log_stats,
+    _alias_log_stats_cache,
+)
+from app.extensions import db
+from app.models import Alias, Contact, EmailLog
+from tests.utils import login
+
+
+def test_alias_log(flask_client):
+    user = login(flask_client)
+    alias = Alias.first()
+
+    # no activity yet
+    r = flask_client.get(url_for("dashboard.alias_log", alias_id=alias.id))
+    assert r.status_code == 200
+    assert b'<span class="count-numbers">0</span>' in r.data
+
+    contact = Contact.create(
+        user_id=user.id,
+        alias_id=alias.id,
+        website_email="contact@example.com",
+        reply_email="rep@sl.local",
+        commit=True,
+    )
+    EmailLog.create(user_id=user.id, contact_id=contact.id)
+    EmailLog.create(user_id=user.id, contact_id=contact.id)
+    EmailLog.create(user_id=user.id, contact_id=contact.id, is_reply=True)
+    EmailLog.create(user_id=user.id, contact_id=contact.id, blocked=True)
+    db.session.commit()
+    # the stats of the empty alias are still cached
+    _alias_log_stats_cache.clear()
+
+    r = flask_client.get(url_for("dashboard.alias_log", alias_id=alias.id))
+    assert r.status_code == 200
+    # total, forwarded, replied, blocked
+    assert b'<span class="count-numbers">4</span>' in r.data
+    assert b'<span class="count-numbers">2</span>' in r.data
+    assert r.data.count(b'<span class="count-numbers">1</span>') == 2
+
+
+def test_alias_log_pagination(flask_client):
+    user = login(flask_client)
+    alias = Alias.first()
+    contact = Contact.create(
+        user_id=user.id,
+        alias_id=alias.id,
+        website_email="contact@example.com",
+        reply_email="rep@sl.local",
+        commit=True,
+    )
+    email_logs = [
+        EmailLog.create(user_id=user.id, contact_id=contact.id)
+        for _ in range(PAGE_LIMIT + 2)
+    ]
+    db.session.commit()
+
+    logs = get_alias_log(alias)
+    assert len(logs) == PAGE_LIMIT
+    assert logs[0].email_log.id == email_logs[-1].id
+
+    # next page
+    logs = get_alias_log(alias, before_id=logs[-1].email_log.id)
+    assert [log.email_log.id for log in logs] == [
+        email_logs[1].id,
+        email_logs[0].id,
+    ]
+
+    # previous page, still most recent first
+    logs = get_alias_log(alias, after_id=email_logs[1].id)
+    assert len(logs) == PAGE_LIMIT
+    assert logs[0].email_log.id == email_logs[-1].id
+    assert logs[-1].email_log.id == email_logs[2].id
+
+    r = flask_client.get(
+        url_for("dashboard.alias_log", alias_id=alias.id, before=email_logs[2].id)
+    )
+    assert r.status_code == 200
+
+
+def test_alias_log_pagination_exact_page(flask_client):
+    user = login(flask_client)
+    alias = Alias.first()
+    contact = Contact.create(
+        user_id=user.id,
+        alias_id=alias.id,
+        website_email="contact@example.com",
+        reply_email="rep@sl.local",
+        commit=True,
+    )
+    email_logs = [
+        EmailLog.create(user_id=user.id, contact_id=contact.id)
+        for _ in range(PAGE_LIMIT)
+    ]
+    db.session.commit()
+
+    # a single full page: no next page
+    r = flask_client.get(url_for("dashboard.alias_log", alias_id=alias.id))
+    assert r.status_code == 200
+    assert f"before={email_logs[0].id}".encode() in r.data
+    assert r.data.count(b"btn btn-outline-secondary disabled") == 2
+
+    # a stale link to an empty page shows the first page
+    r = flask_client.get(
+        url_for("dashboard.alias_log", alias_id=alias.id, before=email_logs[0].id)
+    )
+    assert r.status_code == 200
+    assert f"after={email_logs[-1].id}".encode() in r.data
+
+
+def test_alias_log_legacy_page_url(flask_client):
+    login(flask_client)
+    alias = Alias.first()
+
+    r = flask_client.get(f"/dashboard/alias_log/{alias.id}/2")
+    assert r.status_code == 302
+    assert r.location.endswith(f"/dashboard/alias_log/{alias.id}")
+
+
+def test_get_alias_log_stats(flask_client, monkeypatch):
+    user = login(flask_client)
+    alias = Alias.first()
+    contact = Contact.create(
+        user_id=user.id,
+        alias_id=alias.id,
+        website_email="contact@example.com",
+        reply_email="rep@sl.local",
+        commit=True,
+    )
+    EmailLog.create(user_id=user.id, contact_id=contact.id, commit=True)
+    assert get_alias_log_stats(alias.id) == (1, 1, 0, 0)
+
+    # stats are cached, new email logs show up once they expire
+    EmailLog.create(user_id=user.id, contact_id=contact.id, is_reply=True, commit=True)
+    assert get_alias_log_stats(alias.id) == (1, 1, 0, 0)
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert get_alias_log_stats(alias.id) == (2, 1, 1, 0)
@@ -1,6 +1,10 @@
-from app.alias_utils import delete_alias, check_alias_prefix
+from app.alias_utils import (
+    delete_alias,
+    check_alias_prefix,
+    try_auto_create_directory,
+)
 from app.extensions import db
-from app.models import User, Alias, DeletedAlias
+from app.models import User, Alias, DeletedAlias, Directory
 
 
 def test_delete_alias(flask_client):
@@ -55,3 +59,31 @@ def test_check_alias_prefix(flask_client):
     assert not check_alias_prefix("a b")
     assert not check_alias_prefix("+👌")
     assert not check_alias_prefix("too-long" * 10)
+
+
+def test_try_auto_create_directory(flask_client):
+    user = User.create(
+        email="a@b.c",
+        password="password",
+        name="Test User",
+        activated=True,
+        commit=True,
+    )
+    # no alias limit
+    user.lifetime = True
+    Directory.create(name="dir", user_id=user.id, commit=True)
+    Directory.create(name="dir+sub", user_id=user.id, commit=True)
+
+    # no separator
+    assert try_auto_create_directory("dir@sl.local") is None
+
+    for address, directory_name in [
+        ("dir/a@sl.local", "dir"),
+        ("dir+b@sl.local", "dir"),
+        ("dir#c@sl.local", "dir"),
+        # "/" has priority over "+"
+        ("dir+sub/d@sl.local", "dir+sub"),
+    ]:
+        alias = try_auto_create_directory(address)
+        assert alias.email == address
+        assert alias.directory_id == Directory.get_by(name=directory_name).id
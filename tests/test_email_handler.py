@@ -1,5 +1,10 @@
-from app.models import User, Alias, AuthorizedAddress
-from email_handler import get_mailbox_from_mail_from
+import asyncio
+
+from aiosmtpd.smtp import Envelope
+
+from app.extensions import db
+from app.models import User, Alias, AuthorizedAddress, Contact
+from email_handler import MailHandler, get_mailbox_from_mail_from
 
 
 def test_get_mailbox_from_mail_from(flask_client):
@@ -32,3 +37,49 @@ def test_get_mailbox_from_mail_from(flask_client):
     )
     mb = get_mailbox_from_mail_from("unauthorized@gmail.com", alias)
     assert mb.email == "a@b.c"
+
+
+def test_mail_handler_handle_data(flask_app):
+    with flask_app.app_context():
+        user = User.create(
+            email="a@b.c",
+            password="password",
+            name="Test User",
+            activated=True,
+        )
+        alias = Alias.create(
+            user_id=user.id,
+            email="first@d1.test",
+            mailbox_id=user.default_mailbox_id,
+        )
+        db.session.flush()
+        Contact.create(
+            user_id=user.id,
+            alias_id=alias.id,
+            website_email="contact@example.com",
+            reply_email="rep@sl.local",
+            commit=True,
+        )
+
+    mail_handler = MailHandler(flask_app)
+
+    async def send(mail_from, rcpt_to):
+        envelope = Envelope()
+        envelope.mail_from = mail_from
+        envelope.rcpt_tos = [rcpt_to]
+        envelope.original_content = (
+            f"From: {mail_from}\r\nTo: {rcpt_to}\r\nSubject: hi\r\n\r\nhello"
+        ).encode()
+        return await mail_handler.handle_DATA(None, None, envelope)
+
+    async def send_all():
+        # each message is handled in the thread pool, in its own app context
+        return await asyncio.gather(
+            send("rep@sl.local", "first@d1.test"),
+            send("sender@example.com", "not-exist@d1.test"),
+        )
+
+    assert asyncio.run(send_all()) == [
+        "250 email can't be sent from a reverse-alias",
+        "550 SL E3 Email not exist",
+    ]
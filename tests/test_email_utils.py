@@ -1,9 +1,11 @@
 import email
 from email.message import EmailMessage
+from smtplib import SMTPServerDisconnected
 
 import arrow
 
 from app.config import MAX_ALERT_24H, EMAIL_DOMAIN, BOUNCE_EMAIL
+from app import email_utils
 from app.email_utils import (
     get_email_domain_part,
     can_create_directory_for_address,
@@ -27,6 +29,9 @@ from app.email_utils import (
     should_disable,
     decode_text,
     parse_id_from_bounce,
+    is_sl_domain,
+    _get_smtp,
+    _smtp_local,
 )
 from app.extensions import db
 from app.models import User, CustomDomain, Alias, Contact, EmailLog
@@ -160,6 +165,18 @@ def test_copy():
     msg2 = copy(msg)
     assert to_bytes(msg) == to_bytes(msg2)
 
+    # 8bit non utf-8 content is kept as-is
+    msg = email.message_from_bytes(
+        b"Content-Type: text/plain; charset=iso-8859-1\n"
+        b"Content-Transfer-Encoding: 8bit\n\ncaf\xe9\n"
+    )
+    msg2 = copy(msg)
+    assert to_bytes(msg) == to_bytes(msg2)
+
+    # modifying the copy doesn't affect the original message
+    msg2["Subject"] = "new subject"
+    assert msg["Subject"] is None
+
 
 def test_get_spam_from_header():
     is_spam, _ = get_spam_from_header(
@@ -409,6 +426,26 @@ old
     assert "Test-Header: Test-Value" in new_msg.as_string()
 
 
+def test_replace_nothing_to_replace():
+    msg = email.message_from_string(
+        """Content-Type: multipart/alternative;
+    boundary="foo"
+
+--foo
+Content-Type: text/plain;	charset=us-ascii
+
+nothing here
+
+--foo
+Content-Type: text/html;	charset=us-ascii
+
+<b>nothing here</b>
+"""
+    )
+    # the message isn't copied
+    assert replace(msg, "old", "new") is msg
+
+
 def test_replace_base64_encoding():
     # "b2xk" is "old" base64-encoded
     msg = email.message_from_string(
@@ -713,3 +750,46 @@ def test_should_disable_bounce_consecutive_days(flask_client):
 def test_parse_id_from_bounce():
     assert parse_id_from_bounce("bounces+1234+@local") == 1234
     assert parse_id_from_bounce(BOUNCE_EMAIL.format(1234)) == 1234
+
+
+def test_is_sl_domain(flask_client):
+    assert is_sl_domain("sl.local")
+    assert is_sl_domain("d1.test")
+    assert not is_sl_domain("d3.test")
+
+
+class FakeSMTP:
+    def __init__(self, host, port):
+        self.port = port
+        self.alive = True
+        self.closed = False
+
+    def noop(self):
+        if not self.alive:
+            raise SMTPServerDisconnected()
+        return 250, b"OK"
+
+    def close(self):
+        self.closed = True
+
+
+def test_get_smtp(monkeypatch):
+    monkeypatch.setattr(email_utils, "SMTP", FakeSMTP)
+    monkeypatch.setattr(_smtp_local, "smtps", {}, raising=False)
+
+    # the connection is reused while it's alive
+    smtp = _get_smtp(25)
+    assert _get_smtp(25) is smtp
+
+    # a connection per port
+    submission_smtp = _get_smtp(587)
+    assert submission_smtp is not smtp
+    assert submission_smtp.port == 587
+    assert _get_smtp(25) is smtp
+
+    # a disconnected connection is closed and replaced
+    smtp.alive = False
+    new_smtp = _get_smtp(25)
+    assert new_smtp is not smtp
+    assert smtp.closed
+    assert _get_smtp(587) is submission_smtp
@@ -1,8 +1,17 @@
+import json
+
 import arrow
+from flask import current_app
 
+import server
+from app.config import URL, PADDLE_MONTHLY_PRODUCT_ID
 from app.extensions import db
-from app.models import User, CoinbaseSubscription
-from server import handle_coinbase_event
+from app.models import User, CoinbaseSubscription, Subscription, PlanEnum
+from server import (
+    handle_coinbase_event,
+    handle_paddle_subscription_created,
+    _send_email_with_retry,
+)
 
 
 def test_redirect_login_page(flask_client):
@@ -62,3 +71,87 @@ def test_handle_coinbase_event_extend_subscription(flask_client):
     assert user.is_premium()
 
     assert CoinbaseSubscription.get_by(user_id=user.id) is not None
+
+
+def test_openid_config(flask_client):
+    r = flask_client.get("/.well-known/openid-configuration")
+    assert r.status_code == 200
+    assert r.json["issuer"] == URL
+    assert r.json["jwks_uri"] == URL + "/jwks"
+    assert r.headers["Cache-Control"] == "public, max-age=3600"
+
+
+def test_jwks(flask_client):
+    r = flask_client.get("/jwks")
+    assert r.status_code == 200
+    assert len(r.json["keys"]) == 1
+    assert r.headers["Cache-Control"] == "public, max-age=300"
+
+
+def test_handle_paddle_subscription_created(flask_client):
+    user = User.create(
+        email="a@b.c",
+        password="password",
+        name="Test User",
+        activated=True,
+        commit=True,
+    )
+    assert (
+        handle_paddle_subscription_created(
+            {
+                "passthrough": json.dumps({"user_id": user.id}),
+                "subscription_plan_id": str(PADDLE_MONTHLY_PRODUCT_ID),
+                "subscription_id": "1234",
+                "cancel_url": "https://cancel",
+                "update_url": "https://update",
+                "next_bill_date": "2030-01-01",
+            }
+        )
+        == "OK"
+    )
+
+    sub = Subscription.get_by(user_id=user.id)
+    assert sub.subscription_id == "1234"
+    assert sub.plan == PlanEnum.monthly
+    assert user.is_premium()
+
+    # unknown plan
+    _, status = handle_paddle_subscription_created(
+        {"passthrough": json.dumps({"user_id": user.id}), "subscription_plan_id": "0"}
+    )
+    assert status == 400
+
+
+def test_send_email_with_retry(flask_app, monkeypatch):
+    attempts = []
+
+    def send_email(to_email, subject, plaintext, html):
+        attempts.append(current_app._get_current_object())
+        if len(attempts) < 3:
+            raise Exception("cannot connect")
+
+    monkeypatch.setattr(server, "send_email", send_email)
+    monkeypatch.setattr(server.time, "sleep", lambda _: None)
+
+    # fail twice then succeed
+    _send_email_with_retry(flask_app, "a@b.c", "subject", "plaintext", None)
+    # run in the given app context
+    assert attempts == [flask_app] * 3
+
+
+def test_send_email_with_retry_fail(flask_app, monkeypatch):
+    attempts = []
+    errors = []
+
+    def send_email(to_email, subject, plaintext, html):
+        attempts.append(to_email)
+        raise Exception("cannot connect")
+
+    monkeypatch.setattr(server, "send_email", send_email)
+    monkeypatch.setattr(server.time, "sleep", lambda _: None)
+    monkeypatch.setattr(server.LOG, "exception", lambda *args: errors.append(args))
+
+    # the last failure is logged, not raised
+    _send_email_with_retry(flask_app, "a@b.c", "subject", "plaintext", None)
+    assert len(attempts) == 3
+    assert errors == [("Cannot send email %s to %s", "subject", "a@b.c")]
@@ -1,4 +1,6 @@
-from app.utils import random_string, random_words
+import time
+
+from app.utils import random_string, random_words, TTLCache
 
 
 def test_random_words():
@@ -9,3 +11,20 @@ def test_random_words():
 def test_random_string():
     s = random_string()
     assert len(s) > 0
+
+
+def test_ttl_cache(monkeypatch):
+    cache = TTLCache(ttl=60)
+    assert cache.get("k") is None
+
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("k") is None
+
+    # expired entries are dropped on set
+    cache.set("k2", "v2")
+    assert cache.get("k2") == "v2"
+    assert "k" not in cache._items